@@ -11,4 +11,8 @@ docker build -t airflow-etl .
 docker run -d -p 8080:8080 --name airflow-etl airflow-etl airflow standalone
 docker exec -it airflow-etl airflow users create --role Admin --username user --email admin --firstname admin --lastname admin --password 1234
 
+# Pools used by the DAG to bound concurrent I/O and CPU heavy tasks
+docker exec -it airflow-etl airflow pools set io_pool 2 "S3 and network bound tasks"
+docker exec -it airflow-etl airflow pools set cpu_pool 4 "Parsing and transformation tasks"
+
 #UI: http://localhost:8080
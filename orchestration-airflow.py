@@ -26,42 +26,52 @@ with DAG(
    schedule_interval='0 1 1 * *',  # Run at 1:00 AM on the 1st day of each month
    start_date=datetime(2025, 1, 1),
    catchup=False,
+   max_active_tasks=4,
 ) as dag:
 
    ingest_raw_to_s3 = PythonOperator(
        task_id='ingest_raw_to_s3',
-       python_callable=raw_to_s3_task
+       python_callable=raw_to_s3_task,
+       pool='io_pool'
    )
 
    ingest_download_podcasts = PythonOperator(
        task_id='ingest_download_podcasts', 
-       python_callable=download_podcasts_task
+       python_callable=download_podcasts_task,
+       pool='io_pool'
    )
 
    staging_clean_xml = PythonOperator(
        task_id='staging_clean_xml',
-       python_callable=clean_xml_task
+       python_callable=clean_xml_task,
+       pool='cpu_pool'
    )
 
    staging_logs_data_organize = PythonOperator(
        task_id='logs_data_organize',
-       python_callable=logs_data_organize_task
+       python_callable=logs_data_organize_task,
+       pool='io_pool'
    )
 
    load_create_dwh = PythonOperator(
        task_id='create_dwh',
-       python_callable=create_dwh_task
+       python_callable=create_dwh_task,
+       pool='cpu_pool'
    )
 
    data_quality_verify = PythonOperator(
        task_id='quality_verify',
-       python_callable=quality_verify_task
+       python_callable=quality_verify_task,
+       pool='cpu_pool'
    )
 
    analytics = PythonOperator(
        task_id='analytics',
-       python_callable=analytics_task
+       python_callable=analytics_task,
+       pool='cpu_pool'
    )
 
    # Define task dependencies
-   ingest_raw_to_s3 >> ingest_download_podcasts >> staging_clean_xml >> staging_logs_data_organize >> load_create_dwh >> data_quality_verify >> analytics
\ No newline at end of file
+   # The audio download, feed cleaning and log organizing only need the raw ingest, so they run in parallel
+   ingest_raw_to_s3 >> [ingest_download_podcasts, staging_clean_xml, staging_logs_data_organize]
+   [staging_clean_xml, staging_logs_data_organize] >> load_create_dwh >> data_quality_verify >> analytics
\ No newline at end of file
@@ -1,56 +1,137 @@
 import os
+import io
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from datetime import datetime
 import boto3
 import json
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import nltk
 from nltk.corpus import stopwords
 import logging
+from src_scripts.arrow_cache import cached_batch_reader
+from src_scripts.s3_filesystem import get_s3_fs
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Download NLTK data
-try:
-    nltk.download('stopwords', quiet=True)
-except Exception as e:
-    logger.error(f"Failed to download NLTK stopwords: {e}")
+@lru_cache(maxsize=None)
+def get_stop_words():
+    """Load English stopwords once per process, downloading the corpus only if it is missing."""
+    try:
+        return frozenset(stopwords.words('english'))
+    except LookupError:
+        try:
+            nltk.download('stopwords', quiet=True)
+        except Exception as e:
+            logger.error(f"Failed to download NLTK stopwords: {e}")
+            raise
+        return frozenset(stopwords.words('english'))
 
 # Initialize S3 and paths
 s3 = boto3.client('s3')
 now = datetime.now()
-s3_path = f"s3://curated-data-gold/analytics/podcast_analytics_full/{now.year}/{now.month:02d}/{now.day:02d}/podcast_analytics_full.parquet"
+parquet_key = f"curated-data-gold/analytics/podcast_analytics_full/{now.year}/{now.month:02d}/{now.day:02d}/podcast_analytics_full.parquet"
+s3_path = f"s3://{parquet_key}"
+
+# Only the columns used by analyze_podcasts are read from the parquet file
+ANALYTICS_COLUMNS = [
+    'title', 'pubdate', 'time', 'listen_count', 'like_count',
+    'search_count', 'duration_seconds', 'visitor'
+]
+NS_PER_DAY = 86_400 * 10**9
+CACHE_DIR = '/tmp/pp_cache'
+WORD_PATTERN = r"\w+(?:[״׳'\"]\w+)*"
+
+def read_analytics_table():
+    """Read the projected analytics table, reusing a local Arrow IPC copy while the S3 ETag is unchanged."""
+    bucket, key = parquet_key.split('/', 1)
+    etag = s3.head_object(Bucket=bucket, Key=key)['ETag'].strip('"')
+
+    def load():
+        table = pq.read_table(parquet_key, filesystem=get_s3_fs(), columns=ANALYTICS_COLUMNS)
+        return pa.RecordBatchReader.from_batches(table.schema, table.to_batches())
+
+    return cached_batch_reader(CACHE_DIR, etag, ANALYTICS_COLUMNS, load).read_all()
+
+def top_k(table, col, keep, k=10):
+    """Return the `keep` columns of the k rows with the largest `col` as a DataFrame, in descending order."""
+    values = table[col].to_numpy()
+    if len(values) > k:
+        # O(n) selection of the k-th largest value; ties at the cut keep the earliest rows like nlargest
+        kth = np.partition(values, -k)[-k]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        idx = np.concatenate([above, ties])
+    else:
+        idx = np.arange(len(values))
+    idx = idx[np.lexsort((idx, -values[idx]))]
+    return table.take(idx).select(keep).to_pandas()
 
 def analyze_podcasts():
     """Load podcast data, analyze it, and return results dictionary plus DataFrame."""
     try:
         logger.info(f"Reading parquet file from: {s3_path}")
-        df = pd.read_parquet(s3_path)
-        
-        df['pubdate'] = pd.to_datetime(df['pubdate'], format="%a, %d %b %Y %H:%M:%S %z", utc=True)
-        df['hour'] = pd.to_datetime(df['time']).dt.hour
-
-        stop_words = set(stopwords.words('english'))
-        all_words = ' '.join(df['title'].astype(str)).lower().split()
-        word_freq = Counter([w for w in all_words if w not in stop_words])
+        table = read_analytics_table()
+
+        # Parse pubdate on the Arrow column (tz-aware UTC); the aggregations below run on Arrow/NumPy
+        pubdate = pc.strptime(table['pubdate'], format="%a, %d %b %Y %H:%M:%S %z", unit='ns')
+        table = table.set_column(table.schema.get_field_index('pubdate'), 'pubdate', pubdate)
+        hours = pc.hour(pc.strptime(table['time'], format="%H:%M:%S", unit='s')).to_numpy()
+        listen_counts = table['listen_count'].to_numpy()
+
+        # Release interval from the sorted pubdate values only, without sorting the whole table.
+        # Nulls are dropped first (they would become INT64_MIN); one release has no interval.
+        pubdate_ns = np.sort(
+            pc.drop_null(table['pubdate']).to_numpy().astype('datetime64[ns]').astype('int64')
+        )
+        release_interval = int(np.diff(pubdate_ns).mean() // NS_PER_DAY) if pubdate_ns.size > 1 else np.nan
+
+        # Duration stats in minutes from a single float array: one percentile pass plus the mean
+        duration_seconds = table['duration_seconds'].to_numpy().astype(np.float64)
+        duration_minutes = duration_seconds / 60.0
+        duration_min, duration_median, duration_max = np.percentile(duration_minutes, [0, 50, 100])
+
+        # Hours are bounded to 0..23, so a bincount replaces the hash-based groupby
+        hourly_sums = np.bincount(hours, weights=listen_counts, minlength=24)
+        hour_order = np.argsort(-hourly_sums, kind='stable')
+
+        top_listened = top_k(table, 'listen_count', ['title', 'listen_count', 'visitor'])
+        top_liked = top_k(table, 'like_count', ['title', 'like_count'])
+        top_searched = top_k(table, 'search_count', ['title', 'search_count'])
+        duration_listen_corr = np.corrcoef(duration_seconds, listen_counts)[0, 1]
+
+        df = table.to_pandas(self_destruct=True)
+        del table
+
+        # Word frequencies stay in pandas for its Unicode-aware string splitting.
+        # Gershayim/geresh (and their ASCII stand-ins) inside a word keep Hebrew acronyms such as
+        # יו״ר whole; bare numbers and single letters are not words.
+        stop_words = get_stop_words()
+        words = df['title'].astype('string').str.lower().str.findall(WORD_PATTERN).explode().dropna()
+        words = words[(words.str.len() > 1) & ~words.str.isdigit()]
+        word_freq = words[~words.isin(stop_words)].value_counts().head(25)
 
         analysis = {
-            'top_listened': df.nlargest(10, 'listen_count')[['title', 'listen_count']],
-            'top_liked': df.nlargest(10, 'like_count')[['title', 'like_count']],
-            'top_searched': df.nlargest(10, 'search_count')[['title', 'search_count']],
-            'release_interval': df.sort_values('pubdate')['pubdate'].diff().mean().days,
+            'top_listened': top_listened[['title', 'listen_count']],
+            'top_liked': top_liked,
+            'top_searched': top_searched,
+            'release_interval': release_interval,
             'duration_stats': {
-                'min': df['duration_seconds'].min() / 60,
-                'max': df['duration_seconds'].max() / 60,
-                'mean': df['duration_seconds'].mean() / 60,
-                'median': df['duration_seconds'].median() / 60
+                'min': duration_min,
+                'max': duration_max,
+                'mean': duration_minutes.mean(),
+                'median': duration_median
             },
-            'hourly_listens': df.groupby('hour')['listen_count'].sum().sort_values(ascending=False).to_dict(),
-            'top_guest': df.nlargest(1, 'listen_count')['visitor'].iloc[0],
-            'duration_listen_corr': df['duration_seconds'].corr(df['listen_count']),
-            'top_words': dict(word_freq.most_common(25))
+            'hourly_listens': {int(h): int(hourly_sums[h]) for h in hour_order if hourly_sums[h] > 0},
+            'top_guest': top_listened['visitor'].iloc[0],
+            'duration_listen_corr': duration_listen_corr,
+            'top_words': word_freq.to_dict()
         }
         logger.info("Analysis completed successfully")
         return analysis, df
@@ -74,21 +155,30 @@ def save_analytics_results(results):
             'top_searched.csv': results['top_searched']
         }
 
+        # Render each report once; the same bytes are written locally and uploaded
+        payloads = {}
         for filename, content in files.items():
-            local_path = os.path.join(report_dir, filename)
             if filename.endswith('.json'):
-                with open(local_path, 'w', encoding='utf-8') as f:
-                    json.dump(content, f, indent=4, ensure_ascii=False)
+                data = json.dumps(content, indent=4, ensure_ascii=False).encode('utf-8')
             else:
-                content.to_csv(local_path, index=False)
-            
-            s3.upload_file(
-                local_path,
+                data = content.to_csv(index=False).encode('utf-8')
+            with open(os.path.join(report_dir, filename), 'wb') as f:
+                f.write(data)
+            payloads[filename] = data
+
+        def upload(filename, data):
+            s3.upload_fileobj(
+                io.BytesIO(data),
                 'curated-data-gold',
                 f"analytics/reports/{date_path}/{filename}"
             )
             logger.info(f"Uploaded {filename} to S3")
 
+        with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+            futures = [executor.submit(upload, filename, data) for filename, data in payloads.items()]
+            for future in futures:
+                future.result()
+
         logger.info(f"All files saved locally to '{report_dir}' and uploaded to S3")
 
     except Exception as e:
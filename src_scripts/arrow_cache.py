@@ -0,0 +1,63 @@
+import os
+import logging
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+def cached_batch_reader(cache_dir, etag, columns, load):
+    """
+    Returns a RecordBatchReader over `columns` of an S3 object, served from a local Arrow IPC
+    copy (cache_dir/<etag>.arrow) while the object's ETag is unchanged.
+    On a miss, `load()` supplies a RecordBatchReader whose batches are written to the cache as
+    they are consumed; copies for older ETags in cache_dir are removed.
+    """
+    cache_path = os.path.join(cache_dir, f"{etag}.arrow")
+
+    if os.path.exists(cache_path):
+        source = pa.memory_map(cache_path)
+        cached = pa.ipc.open_file(source)
+        if cached.schema.names == columns:
+            logger.info(f"Using cached Arrow table: {cache_path}")
+            return pa.RecordBatchReader.from_batches(cached.schema, _read_cached(source, cached))
+        source.close()
+
+    reader = load()
+    return pa.RecordBatchReader.from_batches(reader.schema, _write_through(reader, cache_path))
+
+def _read_cached(source, cached):
+    with source:
+        for i in range(cached.num_record_batches):
+            yield cached.get_batch(i)
+
+def _write_through(reader, cache_path):
+    """Yields the reader's batches, copying them to cache_path; the copy is best effort."""
+    cache_dir = os.path.dirname(cache_path)
+    tmp_path = f"{cache_path}.tmp"
+    error = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            # Also clears temp files left by scans that failed part way
+            if name.endswith(('.arrow', '.arrow.tmp')) and os.path.join(cache_dir, name) != cache_path:
+                os.remove(os.path.join(cache_dir, name))
+        writer = pa.ipc.new_file(tmp_path, reader.schema)
+    except OSError as e:
+        error = e
+
+    # Only cache writes are guarded; errors reading the source reach the caller
+    for batch in reader:
+        if error is None:
+            try:
+                writer.write_batch(batch)
+            except OSError as e:
+                error = e
+        yield batch
+
+    if error is None:
+        try:
+            writer.close()
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            error = e
+    if error is not None:
+        logger.warning(f"Could not write Arrow cache {cache_path}: {error}")
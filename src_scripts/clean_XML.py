@@ -1,16 +1,36 @@
-import xml.etree.ElementTree as ET
+from lxml import etree
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
 import re
 import json
 import boto3
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 import io
 import time
 import logging
 
 class FeedProcessor:
+    WHITESPACE_RE = re.compile(r'\s+')
+    EPISODE_RE = re.compile(r'#(\d+)')
+    # Item fields produced by parse_item_element, in output column order
+    ITEM_COLUMNS = [
+        'title', 'itunes:title', 'link', 'comments', 'pubDate', 'guid', 'description',
+        'enclosure_url', 'enclosure_length', 'enclosure_type', 'audio_filename',
+        'itunes:summary', 'itunes:author', 'itunes:explicit', 'itunes:block',
+        'itunes:duration', 'itunes:episode', 'itunes:episodeType', 'itunes:image', 'itunes:season'
+    ]
+    # Feed columns are mostly repeated short strings; nothing downstream filters on row-group stats
+    PARQUET_OPTIONS = {
+        'compression': 'zstd',
+        'compression_level': 1,
+        'use_dictionary': True,
+        'data_page_size': 1 << 20,
+        'write_statistics': False
+    }
+
     def __init__(self, region_name='il-central-1'):
         self.s3_client = boto3.client('s3', region_name=region_name)
         self.current_year = datetime.now().strftime('%Y')
@@ -28,8 +48,8 @@ class FeedProcessor:
     def read_xml_from_s3(self, bucket, key):
         try:
             response = self.s3_client.get_object(Bucket=bucket, Key=key)
-            xml_content = response['Body'].read()
-            return ET.ElementTree(ET.fromstring(xml_content))
+            # Return the streaming body so the feed can be parsed incrementally
+            return response['Body']
         except Exception as e:
             self.logger.error(f"Error reading XML from S3: {str(e)}")
             raise
@@ -46,29 +66,43 @@ class FeedProcessor:
             self.logger.error(f"Error writing to S3: {str(e)}")
             raise
 
-    def convert_duration(self, duration_str):
-        if pd.isna(duration_str):
-            return pd.NaT
-        try:
-            parts = duration_str.split(':')
-            if len(parts) == 3:
-                h, m, s = map(int, parts)
-            elif len(parts) == 2:
-                h = 0
-                m, s = map(int, parts)
-            else:
-                h = 0
-                m = 0
-                s = int(parts[0])
-                
-            total_seconds = h * 3600 + m * 60 + s
-            if total_seconds > 3600:  # More than 1 hour
-                self.logger.warning(f"Duration {duration_str} exceeds 1 hour, capping to 1 hour")
-                return pd.Timedelta(hours=1)
-                
-            return pd.to_timedelta(f"{h}:{m}:{s}")
-        except (ValueError, IndexError):
-            return pd.NaT
+    def set_column(self, table, name, values):
+        """Replace column `name` in an Arrow table, or append it if missing."""
+        index = table.schema.get_field_index(name)
+        if index == -1:
+            return table.append_column(name, values)
+        return table.set_column(index, name, values)
+
+    def parse_duration_part(self, parts, index):
+        """Integer value of one split duration field, or null when it is not a non-negative whole number."""
+        part = pc.utf8_trim_whitespace(pc.list_element(parts, index))
+        # Up to 18 digits always fit int64; Arrow's cast rejects a leading '+', so it is stripped
+        part = pc.if_else(pc.match_substring_regex(part, r'^\+?\d{1,18}$'), part, None)
+        part = pc.cast(pc.utf8_ltrim(part, characters='+'), pa.int64())
+        # Anything this large is capped to an hour anyway; clamping keeps hours * 3600 within int64
+        return pc.min_element_wise(part, 10**12, skip_nulls=False)
+
+    def convert_duration(self, durations):
+        """Convert an Arrow column of HH:MM:SS / MM:SS / SS strings to durations capped at 1 hour."""
+        colons = pc.count_substring(durations, ':')
+        # Padding with '::' guarantees at least three fields per row
+        parts = pc.split_pattern(pc.binary_join_element_wise(durations, '::', ''), ':')
+        first, second, third = (self.parse_duration_part(parts, i) for i in range(3))
+
+        total_seconds = pc.case_when(
+            pc.make_struct(pc.equal(colons, 2), pc.equal(colons, 1)),
+            pc.add(pc.add(pc.multiply(first, 3600), pc.multiply(second, 60)), third),
+            pc.add(pc.multiply(first, 60), second),
+            first
+        )
+
+        over_hour = pc.greater(total_seconds, 3600)  # More than 1 hour
+        if pc.any(over_hour).as_py():
+            capped = pc.filter(durations, over_hour).to_pylist()
+            self.logger.warning(f"{len(capped)} durations exceed 1 hour, capping to 1 hour: {capped}")
+
+        capped_seconds = pc.min_element_wise(total_seconds, 3600, skip_nulls=False)
+        return pc.cast(pc.cast(capped_seconds, pa.duration('s')), pa.duration('ns'))
 
     def create_processing_report(
         self,
@@ -127,6 +161,74 @@ class FeedProcessor:
         except Exception as e:
             self.logger.error(f"Error saving processing report: {str(e)}")
 
+    def parse_channel_element(self, child, channel_data):
+        tag = child.tag
+        if tag.startswith('{http://www.itunes.com'):
+            tag = tag.replace('{http://www.itunes.com/dtds/podcast-1.0.dtd}', 'itunes:')
+        if tag == 'image':
+            image_data = {}
+            for image_child in child:
+                image_data[image_child.tag] = image_child.text
+            channel_data[tag] = image_data
+        elif tag.startswith('itunes:category'):
+            if 'text' in child.attrib:
+                channel_data.setdefault('itunes:categories', []).append(child.attrib['text'])
+            else:
+                for subcat in child:
+                    if 'text' in subcat.attrib:
+                        channel_data.setdefault('itunes:categories', []).append(subcat.attrib['text'])
+        elif tag == 'itunes:owner':
+            owner_data = {}
+            for owner_child in child:
+                owner_data[owner_child.tag] = owner_child.text
+            channel_data[tag] = owner_data
+        else:
+            text = child.text
+            if text:
+                text = self.WHITESPACE_RE.sub(' ', text).strip()
+            channel_data[tag] = text
+
+    def parse_item_element(self, item):
+        item_data = {}
+        for child in item:
+            tag = child.tag
+            if tag == '{http://purl.org/rss/1.0/modules/content/}encoded':
+                continue
+
+            if tag.startswith('{http://www.itunes.com'):
+                tag = tag.replace('{http://www.itunes.com/dtds/podcast-1.0.dtd}', 'itunes:')
+
+            if tag == 'enclosure':
+                item_data['enclosure_url'] = child.get('url')
+                item_data['enclosure_length'] = child.get('length')
+                item_data['enclosure_type'] = child.get('type')
+                if child.get('url'):
+                    item_data['audio_filename'] = child.get('url').split('/')[-1]
+            elif tag == 'itunes:image':
+                item_data[tag] = child.get('href')
+            else:
+                text = child.text
+                if text:
+                    text = self.WHITESPACE_RE.sub(' ', text).strip()
+                item_data[tag] = text
+
+        title_episode_match = self.EPISODE_RE.search(item_data.get('title', '') or '')
+        title_episode = int(title_episode_match.group(1)) if title_episode_match else None
+
+        xml_episode_str = item_data.get('itunes:episode')
+        if xml_episode_str:
+            try:
+                xml_episode = int(xml_episode_str)
+            except ValueError:
+                xml_episode = None
+        else:
+            xml_episode = None
+
+        if title_episode and (not xml_episode or xml_episode != title_episode):
+            item_data['itunes:episode'] = str(title_episode)
+
+        return item_data
+
     def clean_and_convert_rss(self):
         start_time = time.time()
 
@@ -134,20 +236,46 @@ class FeedProcessor:
         target_bucket = 'staging-data-silver'
         xml_key = f'feeds/2024/01/feed.xml'
 
-        tree = self.read_xml_from_s3(source_bucket, xml_key)
-        root = tree.getroot()
-        channel = root.find('channel')
+        body = self.read_xml_from_s3(source_bucket, xml_key)
 
+        # Single streaming pass: channel metadata, item parsing, item count and latest date
+        channel_data = {}
+        item_columns = {name: [] for name in self.ITEM_COLUMNS}
+        item_count = 0
         latest_date = None
-        for item in channel.findall('item'):
-            pub_date = item.find('pubDate')
-            if pub_date is not None and pub_date.text:
+
+        for _, elem in etree.iterparse(body, events=('end',), remove_comments=True):
+            parent = elem.getparent()
+            if parent is None or parent.tag != 'channel':
+                continue
+
+            if elem.tag != 'item':
+                self.parse_channel_element(elem, channel_data)
+                continue
+
+            item_data = self.parse_item_element(elem)
+
+            # Accumulate items column-wise so the Arrow table is built without a pandas intermediate
+            pub_date = item_data.get('pubDate')
+            for name, values in item_columns.items():
+                values.append(item_data.pop(name, None))
+            for name, value in item_data.items():
+                # Tags outside ITEM_COLUMNS get a new column, back-filled for earlier items
+                item_columns[name] = [None] * item_count + [value]
+            item_count += 1
+
+            if pub_date:
                 try:
-                    date = datetime.strptime(pub_date.text, '%a, %d %b %Y %H:%M:%S %z')
+                    date = parsedate_to_datetime(pub_date)
                     if latest_date is None or date > latest_date:
                         latest_date = date
-                except ValueError:
-                    continue
+                except (TypeError, ValueError):
+                    pass
+
+            # Free the processed item and everything parsed before it
+            elem.clear()
+            while elem.getprevious() is not None:
+                del parent[0]
 
         if latest_date is None:
             latest_date = datetime.now()
@@ -155,151 +283,90 @@ class FeedProcessor:
         silver_year = latest_date.strftime('%Y')
         silver_month = latest_date.strftime('%m')
 
-        xml_episode_count = len(channel.findall('item'))
+        xml_episode_count = item_count
         self.logger.info(f"Number of episodes in XML: {xml_episode_count}")
 
-        channel_data = {}
-        for child in channel:
-            tag = child.tag
-            if tag.startswith('{http://www.itunes.com'):
-                tag = tag.replace('{http://www.itunes.com/dtds/podcast-1.0.dtd}', 'itunes:')
-            if tag == 'image':
-                image_data = {}
-                for image_child in child:
-                    image_data[image_child.tag] = image_child.text
-                channel_data[tag] = image_data
-            elif tag.startswith('itunes:category'):
-                if 'text' in child.attrib:
-                    channel_data.setdefault('itunes:categories', []).append(child.attrib['text'])
-                else:
-                    for subcat in child:
-                        if 'text' in subcat.attrib:
-                            channel_data.setdefault('itunes:categories', []).append(subcat.attrib['text'])
-            elif tag == 'itunes:owner':
-                owner_data = {}
-                for owner_child in child:
-                    owner_data[owner_child.tag] = owner_child.text
-                channel_data[tag] = owner_data
-            else:
-                text = child.text
-                if text:
-                    text = re.sub(r'\s+', ' ', text.strip())
-                channel_data[tag] = text
-
         channel_df = pd.DataFrame([channel_data])
         channel_table = pa.Table.from_pandas(channel_df)
         channel_parquet_buffer = io.BytesIO()
-        pq.write_table(channel_table, channel_parquet_buffer)
-        channel_df_size = len(channel_parquet_buffer.getvalue())
+        pq.write_table(channel_table, channel_parquet_buffer, **self.PARQUET_OPTIONS)
+        # getbuffer() exposes the written bytes without copying; getvalue() copies once for the upload
+        channel_df_size = channel_parquet_buffer.getbuffer().nbytes
 
         channel_parquet_key = f'feeds/data/channel/{silver_year}/{silver_month}/channel.parquet'
         self.write_to_s3(channel_parquet_buffer.getvalue(), target_bucket, channel_parquet_key)
 
-        items = []
-        for item in channel.findall('item'):
-            item_data = {}
-            for child in item:
-                tag = child.tag
-                if tag == '{http://purl.org/rss/1.0/modules/content/}encoded':
-                    continue
-
-                if tag.startswith('{http://www.itunes.com'):
-                    tag = tag.replace('{http://www.itunes.com/dtds/podcast-1.0.dtd}', 'itunes:')
-
-                if tag == 'enclosure':
-                    item_data['enclosure_url'] = child.get('url')
-                    item_data['enclosure_length'] = child.get('length')
-                    item_data['enclosure_type'] = child.get('type')
-                    if child.get('url'):
-                        item_data['audio_filename'] = child.get('url').split('/')[-1]
-                elif tag == 'itunes:image':
-                    item_data[tag] = child.get('href')
-                else:
-                    text = child.text
-                    if text:
-                        text = re.sub(r'\s+', ' ', text.strip())
-                    item_data[tag] = text
-
-            title_episode_match = re.search(r'#(\d+)', item_data.get('title', '') or '')
-            title_episode = int(title_episode_match.group(1)) if title_episode_match else None
-
-            xml_episode_str = item_data.get('itunes:episode')
-            if xml_episode_str:
-                try:
-                    xml_episode = int(xml_episode_str)
-                except ValueError:
-                    xml_episode = None
-            else:
-                xml_episode = None
-
-            if title_episode and (not xml_episode or xml_episode != title_episode):
-                item_data['itunes:episode'] = str(title_episode)
-
-            items.append(item_data)
+        table = pa.table({name: pa.array(values, pa.string()) for name, values in item_columns.items()})
 
-        df = pd.DataFrame(items)
+        table = self.set_column(table, 'itunes:season', pc.fill_null(table['itunes:season'], '1'))
+        table = self.set_column(table, 'itunes:episodeType', pc.fill_null(table['itunes:episodeType'], 'unknown'))
 
-        df['itunes:season'] = df['itunes:season'].fillna('1')
-        df['itunes:episodeType'] = df['itunes:episodeType'].fillna('unknown')
-        df['itunes:duration_td'] = df['itunes:duration'].apply(self.convert_duration)
+        duration_td = self.convert_duration(table['itunes:duration'])
+        table = self.set_column(table, 'itunes:duration_td', duration_td)
 
         # Check for episodes over 1 hour
-        over_hour = df[df['itunes:duration_td'] > pd.Timedelta(hours=1)]
-        if not over_hour.empty:
+        over_hour = pc.greater(duration_td, pa.scalar(timedelta(hours=1), pa.duration('ns')))
+        if pc.any(over_hour).as_py():
             print("\nEpisodes with duration over 1 hour:")
-            print(over_hour[['title', 'itunes:duration', 'itunes:duration_td']])
-
-        df['itunes:episode'] = pd.to_numeric(df['itunes:episode'], errors='coerce').fillna(0)
-
-        if 'itunes:title' in df.columns:
-            df = df.drop(columns=['itunes:title'])
-
-        df.columns = (
-            df.columns
-            .str.replace('itunes:', '', regex=False)
-            .str.replace('episodeType', 'episodetype', regex=False)
-            .str.replace('pubDate', 'pubdate', regex=False)
-        )
-
-        negative_episodes = df[df['episode'] < 0]
-        if not negative_episodes.empty:
+            print(table.filter(over_hour).select(['title', 'itunes:duration', 'itunes:duration_td']).to_pandas())
+
+        # Non-numeric episode numbers become 0; up to 18 digits always fit int64, and Arrow's
+        # cast rejects a leading '+', so it is stripped first
+        episode = table['itunes:episode']
+        episode = pc.if_else(pc.match_substring_regex(episode, r'^\s*[+-]?\d{1,18}\s*$'), episode, None)
+        episode = pc.utf8_ltrim(pc.utf8_trim_whitespace(episode), characters='+')
+        episode = pc.fill_null(pc.cast(episode, pa.int64()), 0)
+        table = self.set_column(table, 'itunes:episode', episode)
+
+        if 'itunes:title' in table.column_names:
+            table = table.select([name for name in table.column_names if name != 'itunes:title'])
+
+        table = table.rename_columns([
+            name
+            .replace('itunes:', '')
+            .replace('episodeType', 'episodetype')
+            .replace('pubDate', 'pubdate')
+            for name in table.column_names
+        ])
+
+        negative_episodes = table.filter(pc.less(table['episode'], 0))
+        if negative_episodes.num_rows:
             print("\nRows with negative episode numbers:")
-            print(negative_episodes)
+            print(negative_episodes.to_pandas())
 
         print("\nCount Validation:")
         print("----------------")
         print(f"Episodes in source XML: {xml_episode_count}")
-        print(f"Episodes in processed parquet: {len(df)}")
-        if xml_episode_count != len(df):
+        print(f"Episodes in processed parquet: {table.num_rows}")
+        if xml_episode_count != table.num_rows:
             print("WARNING: Source and processed counts don't match!")
             self.logger.warning(
-                f"Count mismatch: XML has {xml_episode_count} episodes but parquet has {len(df)}"
+                f"Count mismatch: XML has {xml_episode_count} episodes but parquet has {table.num_rows}"
             )
         else:
             print("✓ Source and processed counts match")
 
-        print("\nChannel Parquet Sample:")
-        print("----------------------")
-        channel_sample = pd.read_parquet(io.BytesIO(channel_parquet_buffer.getvalue()))
-        print(channel_sample.head().to_string())
-
-        table = pa.Table.from_pandas(df)
         feed_parquet_buffer = io.BytesIO()
-        pq.write_table(table, feed_parquet_buffer)
-        df_size = len(feed_parquet_buffer.getvalue())
-
-        print("\nFeed Parquet Sample:")
-        print("-------------------")
-        feed_sample = pd.read_parquet(io.BytesIO(feed_parquet_buffer.getvalue()))
-        print("\nAll Columns:", feed_sample.columns.tolist())
-        print("\nFirst row sample:")
-        pd.set_option('display.max_columns', None)
-        pd.set_option('display.width', None)
-        pd.set_option('display.max_colwidth', None)
-        print(feed_sample.head(1).to_string())
-
-        print("\nTotal number of columns:", len(feed_sample.columns))
-        print("Number of rows:", len(feed_sample))
+        pq.write_table(table, feed_parquet_buffer, **self.PARQUET_OPTIONS)
+        df_size = feed_parquet_buffer.getbuffer().nbytes
+
+        # Samples come from the in-memory data rather than re-reading the written parquet
+        if self.logger.isEnabledFor(logging.DEBUG):
+            print("\nChannel Parquet Sample:")
+            print("----------------------")
+            print(channel_df.head().to_string())
+
+            print("\nFeed Parquet Sample:")
+            print("-------------------")
+            print("\nAll Columns:", table.column_names)
+            print("\nFirst row sample:")
+            pd.set_option('display.max_columns', None)
+            pd.set_option('display.width', None)
+            pd.set_option('display.max_colwidth', None)
+            print(table.slice(0, 1).to_pandas().to_string())
+
+            print("\nTotal number of columns:", table.num_columns)
+            print("Number of rows:", table.num_rows)
 
         feed_parquet_key = f'feeds/data/episodes/{silver_year}/{silver_month}/feed.parquet'
         self.write_to_s3(feed_parquet_buffer.getvalue(), target_bucket, feed_parquet_key)
@@ -1,24 +1,86 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import boto3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-import re
 from tqdm import tqdm
 import logging
+from src_scripts.s3_filesystem import get_s3_fs
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+thread_local = threading.local()
+
+# Columns actually used downstream of each read
+FEED_COLUMNS = [
+    'title', 'pubdate', 'description', 'author', 'duration',
+    'episode', 'episodetype', 'season'
+]
+LOG_COLUMNS = ['timestamp', 'unique_id', 'event', 'episode_number']
+
+# Final column layout and types of the analytics table
+DWH_SCHEMA = pa.schema([
+    ('title', pa.string()),
+    ('pubdate', pa.string()),
+    ('year', pa.int64()),
+    ('month', pa.int64()),
+    ('day', pa.int64()),
+    ('time', pa.string()),
+    ('description', pa.string()),
+    ('author', pa.string()),
+    ('duration', pa.string()),
+    ('duration_seconds', pa.int64()),
+    ('episode', pa.int64()),
+    ('episodetype', pa.string()),
+    ('season', pa.int64()),
+    ('visitor', pa.string()),
+    ('search_count', pa.int64()),
+    ('listen_count', pa.int64()),
+    ('like_count', pa.int64())
+])
+
+# Gold tables are read back by column and filtered on episode/event, so keep stats and dictionaries
+PARQUET_OPTIONS = {
+    'compression': 'zstd',
+    'compression_level': 3,
+    'row_group_size': 1 << 17,
+    'use_dictionary': True,
+    'data_page_size': 1 << 20,
+    'write_statistics': True
+}
+
+def get_s3_client():
+    # One client per thread, created on first use instead of on every call
+    if not hasattr(thread_local, 's3_client'):
+        thread_local.s3_client = boto3.session.Session().client('s3')
+    return thread_local.s3_client
+
+def read_parquet_from_s3(bucket, key, columns):
+    # pyarrow's native S3 client with pre-buffering coalesces the column reads into few requests
+    table = pq.read_table(
+        f"{bucket}/{key}",
+        filesystem=get_s3_fs(),
+        columns=columns,
+        pre_buffer=True,
+        use_threads=True
+    )
+    return table.to_pandas()
+
 def get_latest_feed():
-    s3 = boto3.client('s3')
+    s3 = get_s3_client()
     bucket = 'staging-data-silver'
     response = s3.list_objects_v2(Bucket=bucket, Prefix='feeds/')
     feed_files = [obj for obj in response['Contents'] if obj['Key'].endswith('feed.parquet')]
     latest_file = max(feed_files, key=lambda x: x['LastModified'])
     logger.info(f"Latest feed file: {latest_file['Key']}")
-    return pd.read_parquet(f"s3://{bucket}/{latest_file['Key']}")
+    return read_parquet_from_s3(bucket, latest_file['Key'], FEED_COLUMNS)
 
 def get_latest_logs():
-    s3 = boto3.client('s3')
+    s3 = get_s3_client()
     bucket = 'staging-data-silver'
     all_files = []
     response = s3.list_objects_v2(Bucket=bucket, Prefix='logs/data/')
@@ -37,8 +99,8 @@ def get_latest_logs():
 
     logger.info(f"Latest log files:\n100k: {logs_100k['Key']}\n30k: {logs_30k['Key']}")
 
-    logs_100k_df = pd.read_parquet(f"s3://{bucket}/{logs_100k['Key']}")
-    logs_30k_df = pd.read_parquet(f"s3://{bucket}/{logs_30k['Key']}")
+    logs_100k_df = read_parquet_from_s3(bucket, logs_100k['Key'], LOG_COLUMNS)
+    logs_30k_df = read_parquet_from_s3(bucket, logs_30k['Key'], LOG_COLUMNS)
 
     # Validation checks
     for df, name in [(logs_100k_df, '100k'), (logs_30k_df, '30k')]:
@@ -51,29 +113,27 @@ def get_latest_logs():
 
     return logs_100k_df, logs_30k_df
 
-def extract_visitor(title):
-    pattern = r'MamraMic#\d+\s*-\s*(.*)'
-    match = re.search(pattern, title)
-    if match:
-        return match.group(1).strip()
-    return None
-
 def process_logs(logs_df):
+    # Group on integer category codes instead of hashing event strings
+    logs_df = logs_df.assign(event=logs_df['event'].astype('category'))
     pre_rows = len(logs_df)
     pre_events = logs_df['event'].value_counts().to_dict()
 
-    grouped = logs_df.groupby(['episode_number', 'event'])['unique_id'].count().reset_index()
-    pivot_df = grouped.pivot(
-        index='episode_number',
-        columns='event',
-        values='unique_id'
-    ).reset_index()
-
-    pivot_df = pivot_df.rename(columns={
-        'search': 'search_count',
-        'listen': 'listen_count',
-        'like': 'like_count'
-    }).fillna(0)
+    # Count and pivot in one grouping; episodes without a given event get 0
+    pivot_df = (
+        logs_df.groupby(['episode_number', 'event'], sort=False, observed=True)
+        .size()
+        .unstack('event', fill_value=0)
+        .reindex(columns=['search', 'listen', 'like'], fill_value=0)
+        .rename(columns={
+            'search': 'search_count',
+            'listen': 'listen_count',
+            'like': 'like_count'
+        })
+        .astype('int32')
+        .rename_axis(columns=None)
+        .reset_index()
+    )
 
     total_events = sum(pivot_df[['search_count', 'listen_count', 'like_count']].sum())
     logger.info(f"\nValidation Results:")
@@ -88,12 +148,15 @@ def process_logs(logs_df):
 
 def validate_and_clean_data(df):
     start_time = datetime.now()
+    debug = logger.isEnabledFor(logging.DEBUG)
 
-    initial_nulls = df.isnull().sum()
-    initial_duplicates = df['episode'].duplicated().sum()
-    initial_size = df.memory_usage().sum() / (1024 * 1024)
+    # Full-frame null/duplicate/memory scans only feed diagnostics
+    if debug:
+        initial_nulls = df.isnull().sum()
+        initial_duplicates = df['episode'].duplicated().sum()
+        initial_size = df.memory_usage().sum() / (1024 * 1024)
 
-    logger.info(f"""
+        logger.debug(f"""
   Initial Stats:
   - Null values per column: {initial_nulls[initial_nulls > 0].to_dict()}
   - Duplicate episodes: {initial_duplicates}
@@ -101,41 +164,24 @@ def validate_and_clean_data(df):
   - Total columns: {len(df.columns)}
   """)
 
-    null_rows = df[df[['episode_number', 'like_count', 'listen_count', 'search_count']].isnull().any(axis=1)]
-    if not null_rows.empty:
+    null_mask = df[['like_count', 'listen_count', 'search_count']].isna().to_numpy().any(axis=1)
+    if null_mask.any():
         logger.info(
-            f"Removing rows with null values:\n{null_rows[['episode', 'title', 'episode_number', 'like_count', 'listen_count', 'search_count']]}")
-        df = df.dropna(subset=['episode_number', 'like_count', 'listen_count', 'search_count'])
+            f"Removing rows with null values:\n{df.loc[null_mask, ['episode', 'title', 'like_count', 'listen_count', 'search_count']]}")
+        df = df.loc[~null_mask]
 
-    required_fields = [
-        'title', 'pubdate', 'year', 'month', 'day', 'time', 'description', 'author',
-        'duration', 'duration_seconds', 'episode', 'episodetype',
-        'season', 'visitor', 'search_count', 'listen_count', 'like_count'
-    ]
-
-    df = df[required_fields].copy()
+    df = df[DWH_SCHEMA.names].copy()
     df['visitor'] = df['visitor'].fillna('Unknown')
 
-    df['title'] = df['title'].astype(str)
-    df['pubdate'] = df['pubdate'].astype(str)
-    df['description'] = df['description'].astype(str)
-    df['author'] = df['author'].astype(str)
-    df['duration'] = df['duration'].astype(str)
-    df['duration_seconds'] = df['duration_seconds'].astype('int64')
-    df['episode'] = df['episode'].astype('int64')
-    df['episodetype'] = df['episodetype'].astype(str)
-    df['season'] = df['season'].astype('int64')
-    df['visitor'] = df['visitor'].astype(str)
-    df['year'] = df['year'].astype('int64')
-    df['month'] = df['month'].astype('int64')
-    df['day'] = df['day'].astype('int64')
-    df['time'] = df['time'].astype(str)
-    df[['search_count', 'listen_count', 'like_count']] = df[['search_count', 'listen_count', 'like_count']].astype('int64')
-
-    end_time = datetime.now()
-    final_size = df.memory_usage().sum() / (1024 * 1024)
-
-    logger.info(f"""
+    # Cast every column to its final type in a single Arrow pass
+    table = pa.Table.from_pandas(df, preserve_index=False).cast(DWH_SCHEMA, safe=False)
+    df = table.to_pandas()
+
+    if debug:
+        end_time = datetime.now()
+        final_size = df.memory_usage().sum() / (1024 * 1024)
+
+        logger.debug(f"""
   Final Stats:
   - Processing time: {(end_time - start_time).total_seconds():.2f} seconds
   - Memory usage: {final_size:.2f} MB
@@ -143,50 +189,40 @@ def validate_and_clean_data(df):
   """)
     return df
 
-def duration_to_seconds_capped(duration):
-    """
-    Convert HH:MM:SS or MM:SS into total seconds and cap at 3600 seconds (1 hour).
-    """
-    parts = duration.split(':')
-    if len(parts) == 3:
-        hours, minutes, seconds = map(int, parts)
-        total_seconds = hours * 3600 + minutes * 60 + seconds
-    elif len(parts) == 2:
-        minutes, seconds = map(int, parts)
-        total_seconds = minutes * 60 + seconds
-    else:
-        # Handle unexpected formats (or set total_seconds = 0, etc.)
-        total_seconds = 0
-
-    # Cap any duration over 1 hour to exactly 1 hour (3600 seconds)
-    total_seconds = min(total_seconds, 3600)
-    return total_seconds
-
-def keep_or_cap_duration_str(duration):
+def cap_durations(durations):
     """
-    Convert the original duration string into "HH:MM:SS" format,
-    capped at 1 hour if total exceeds 3600 seconds.
+    Convert a Series of HH:MM:SS or MM:SS strings into total seconds capped at 3600 seconds (1 hour).
+    Returns the capped seconds and the matching "HH:MM:SS" strings.
     """
-    total_seconds = duration_to_seconds_capped(duration)
-    hours = total_seconds // 3600
-    remainder = total_seconds % 3600
-    minutes = remainder // 60
-    seconds = remainder % 60
-    # Return a HH:MM:SS string
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    durations = durations.astype(str)
+    colons = durations.str.count(':').to_numpy()
+    parts = durations.str.split(':', expand=True).reindex(columns=range(3))
+    parts = parts.apply(pd.to_numeric, errors='coerce').fillna(0).astype('int64')
+
+    # Unexpected formats get 0 seconds
+    total_seconds = pd.Series(
+        np.select(
+            [colons == 2, colons == 1],
+            [parts[0] * 3600 + parts[1] * 60 + parts[2], parts[0] * 60 + parts[1]],
+            default=0
+        ),
+        index=durations.index
+    ).clip(upper=3600)
+
+    hours = (total_seconds // 3600).astype(str).str.zfill(2)
+    minutes = (total_seconds % 3600 // 60).astype(str).str.zfill(2)
+    seconds = (total_seconds % 60).astype(str).str.zfill(2)
+    return total_seconds, hours + ':' + minutes + ':' + seconds
 
 def process_data():
     feed_df = get_latest_feed()
     logger.info(f"Feed columns: {feed_df.columns.tolist()}")
 
-    # Drop columns that are not needed
-    feed_df = feed_df.drop([
-        'image', 'link', 'comments', 'guid', 'enclosure_url',
-        'enclosure_length', 'enclosure_type', 'summary', 'explicit',
-        'block', 'duration_td'
-    ], axis=1, errors='ignore')
-
-    feed_df['visitor'] = feed_df['title'].apply(extract_visitor)
+    feed_df['visitor'] = (
+        feed_df['title'].astype('string')
+        .str.extract(r'MamraMic#\d+\s*-\s*(.*)', expand=False)
+        .str.strip()
+    )
 
     # Convert 'pubdate' to datetime (UTC) and extract date/time parts
     feed_df['pubdate_dt'] = pd.to_datetime(feed_df['pubdate'], format="%a, %d %b %Y %H:%M:%S %z", utc=True)
@@ -196,29 +232,35 @@ def process_data():
     feed_df['time'] = feed_df['pubdate_dt'].dt.strftime('%H:%M:%S')
     feed_df.drop('pubdate_dt', axis=1, inplace=True)
 
-    # Convert duration to capped seconds
-    feed_df['duration_seconds'] = feed_df['duration'].apply(duration_to_seconds_capped)
-
-    # (Optional) also modify the text duration to reflect the 1-hour cap
-    feed_df['duration'] = feed_df['duration'].apply(keep_or_cap_duration_str)
+    # Convert duration to capped seconds and rewrite the text duration to reflect the 1-hour cap
+    feed_df['duration_seconds'], feed_df['duration'] = cap_durations(feed_df['duration'])
 
     # Convert episode and season to int
     feed_df['episode'] = feed_df['episode'].astype(int)
     feed_df['season'] = feed_df['season'].astype(int)
 
-    # Combine logs
+    # Count each log set separately and add the pivots instead of concatenating the raw logs
     logs_100k, logs_30k = get_latest_logs()
-    logs_df = pd.concat([logs_100k, logs_30k])
-    event_counts = process_logs(logs_df)
-    event_counts['episode_number'] = event_counts['episode_number'].astype(int)
+    event_counts = (
+        process_logs(logs_100k).set_index('episode_number')
+        .add(process_logs(logs_30k).set_index('episode_number'), fill_value=0)
+        .fillna(0)
+        .astype('int32')
+    )
+    event_counts.index = event_counts.index.astype(int)
 
-    # Merge feed and logs
-    final_df = pd.merge(feed_df, event_counts, left_on='episode', right_on='episode_number', how='left')
+    # Join feed and logs on the episode_number index; episodes without logs get null counts
+    final_df = feed_df.join(event_counts, on='episode', how='left')
 
     # Clean up final data
     return validate_and_clean_data(final_df)
 
 def create_dimensional_model(df):
+    df = df.assign(
+        visitor=df['visitor'].astype('category'),
+        author=df['author'].astype('category'),
+        episodetype=df['episodetype'].astype('category')
+    )
     dim_tables = {
         'dim_date': df[['year', 'month', 'day', 'time']].drop_duplicates(),
         'dim_episode': df[[
@@ -256,45 +298,43 @@ def save_to_s3(df, path, table_type):
         # or s3://curated-data-gold/analytics/podcast_analytics_full/2025/01/25/podcast_analytics_full.parquet
         base = f"{base_path[table_type]}/{date_path}/{path}"
 
-    parquet_path = f"s3://curated-data-gold/{base}.parquet"
-    df.to_parquet(parquet_path, index=False, engine='pyarrow')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    buffer = pa.BufferOutputStream()
+    pq.write_table(table, buffer, **PARQUET_OPTIONS)
+    parquet_bytes = buffer.getvalue()
 
-    s3 = boto3.client('s3')
-    try:
-        parquet_response = s3.head_object(
-            Bucket='curated-data-gold',
-            Key=parquet_path.replace('s3://curated-data-gold/', '')
-        )
-        parquet_size = parquet_response['ContentLength'] / (1024 * 1024)
-        logger.info(f"Saved {base}:")
-        logger.info(f"- Parquet: {parquet_size:.2f} MB")
-    except:
-        logger.warning(f"Could not get file sizes for {base}")
+    # The size is known from the buffer, so no head_object round-trip is needed after the upload
+    get_s3_client().put_object(
+        Bucket='curated-data-gold',
+        Key=f"{base}.parquet",
+        Body=parquet_bytes.to_pybytes()
+    )
+    logger.info(f"Saved {base}:")
+    logger.info(f"- Parquet: {parquet_bytes.size / (1024 * 1024):.2f} MB")
 
 def main():
     start_time = datetime.now()
     try:
         logger.info("Starting ETL process...")
-        with tqdm(total=5) as pbar:
+        with tqdm(total=8) as pbar:
             final_df = process_data()
             pbar.update(1)
 
-            # Save the full analytics file
-            save_to_s3(final_df, 'podcast_analytics_full', 'analytics')
-            pbar.update(1)
-
-            # Create & save dimension/fact tables
+            # Create dimension/fact tables
             dim_tables = create_dimensional_model(final_df)
             pbar.update(1)
 
-            # Fact table
-            save_to_s3(dim_tables['fact_engagement'], 'fact_engagement', 'fact')
-
-            # Dimensions
+            # Save the full analytics file, the fact table and the dimensions concurrently;
+            # every table goes to its own key, so the uploads are independent
+            writes = [(final_df, 'podcast_analytics_full', 'analytics')]
             for table_name, df_dim in dim_tables.items():
-                if table_name != 'fact_engagement':
-                    save_to_s3(df_dim, table_name, 'dim')
-            pbar.update(2)
+                writes.append((df_dim, table_name, 'fact' if table_name == 'fact_engagement' else 'dim'))
+
+            with ThreadPoolExecutor(max_workers=6) as executor:
+                futures = [executor.submit(save_to_s3, *write) for write in writes]
+                for future in as_completed(futures):
+                    future.result()
+                    pbar.update(1)
 
         end_time = datetime.now()
         logger.info(
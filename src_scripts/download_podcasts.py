@@ -1,4 +1,5 @@
 import subprocess
+import io
 from xml.etree import ElementTree as ET
 import boto3
 import requests
@@ -8,19 +9,30 @@ from tqdm import tqdm
 import logging
 import json
 import time
+import threading
+from boto3.s3.transfer import TransferConfig
+from mutagen import File as MutagenFile
+from mutagen.mp3 import MPEGInfo
 from concurrent.futures import ThreadPoolExecutor
 
+# Bytes fetched from the start of an episode to read its MP3 frame headers
+PROBE_BYTES = 64 * 1024
+
 class PodcastDownloader:
-    def __init__(self, region_name='il-central-1', max_workers=1):
+    def __init__(self, region_name='il-central-1', max_workers=8):
+        self.region_name = region_name
         self.s3_client = boto3.client('s3', region_name=region_name)
         self.current_year = datetime.now().strftime('%Y')
         self.current_month = datetime.now().strftime('%m')
-        self.session = requests.Session()
         self.setup_logging()
         self.total_downloaded_size = 0
         self.start_time = None
         self.error_files = []
         self.max_workers = max_workers
+        # Worker threads each get their own boto3 session/client and HTTP session
+        self.thread_local = threading.local()
+        self.lock = threading.Lock()
+        self.transfer_config = TransferConfig(multipart_threshold=8 * 1024 * 1024, max_concurrency=4)
 
     def setup_logging(self):
         logging.basicConfig(
@@ -30,15 +42,25 @@ class PodcastDownloader:
         )
         self.logger = logging.getLogger(__name__)
 
-    def file_exists_in_s3(self, filename):
-        try:
-            s3_key = f'audio/podcasts/{self.current_year}/{self.current_month}/{filename}'
-            self.s3_client.head_object(Bucket='raw-data-bronze', Key=s3_key)
-            return True
-        except self.s3_client.exceptions.ClientError as e:
-            if e.response['Error']['Code'] == '404':
-                return False
-            raise
+    def get_worker_s3_client(self):
+        if not hasattr(self.thread_local, 's3_client'):
+            self.thread_local.s3_client = boto3.session.Session().client('s3', region_name=self.region_name)
+        return self.thread_local.s3_client
+
+    def get_worker_http_session(self):
+        if not hasattr(self.thread_local, 'http_session'):
+            self.thread_local.http_session = requests.Session()
+        return self.thread_local.http_session
+
+    def list_existing_files(self):
+        """Return the file names already uploaded under this month's audio prefix, in one paginated listing."""
+        existing = set()
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        prefix = f'audio/podcasts/{self.current_year}/{self.current_month}/'
+        for page in paginator.paginate(Bucket='raw-data-bronze', Prefix=prefix):
+            for obj in page.get('Contents', []):
+                existing.add(obj['Key'].rsplit('/', 1)[-1])
+        return existing
 
     def read_xml_from_s3(self):
         try:
@@ -53,18 +75,11 @@ class PodcastDownloader:
 
     def get_audio_duration(self, file_path):
         try:
-            result = subprocess.run(
-                [
-                    "ffprobe", "-i", str(file_path),
-                    "-show_entries", "format=duration",
-                    "-v", "quiet", "-of", "csv=p=0"
-                ],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            duration = float(result.stdout.strip())
-            return duration
+            # Reads the duration from the stream headers in-process instead of spawning ffprobe
+            audio = MutagenFile(str(file_path))
+            if audio is None:
+                raise ValueError(f"Unrecognized audio format: {file_path}")
+            return audio.info.length
         except Exception as e:
             self.logger.error(f"Error determining audio duration: {str(e)}")
             raise
@@ -97,11 +112,93 @@ class PodcastDownloader:
             self.logger.error(f"Error cutting audio file: {str(e)}")
             raise
 
+    def parse_feed_duration(self, duration_text):
+        """Seconds from an itunes:duration value (HH:MM:SS, MM:SS or SS), or None if it cannot be parsed."""
+        try:
+            seconds = 0
+            for part in duration_text.strip().split(':'):
+                seconds = seconds * 60 + int(part)
+            return seconds
+        except (AttributeError, ValueError):
+            return None
+
+    def fetch_range(self, url, start, length):
+        """Returns bytes [start, start + length) of url and the file's total size, or (None, None) without range support."""
+        headers = {'Range': f'bytes={start}-{start + length - 1}'}
+        with self.get_worker_http_session().get(url, headers=headers, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            content_range = response.headers.get('Content-Range', '')
+            if response.status_code != 206 or not content_range.rsplit('/', 1)[-1].isdigit():
+                return None, None
+            return response.raw.read(length), int(content_range.rsplit('/', 1)[-1])
+
+    def probe_audio_duration(self, url):
+        """
+        Estimates an episode's real length from its first MP3 frames and its total size, with ranged GETs
+        instead of a full download. Returns None when it cannot tell, so the caller falls back to cutting.
+        """
+        try:
+            head, total_size = self.fetch_range(url, 0, PROBE_BYTES)
+            if head is None:
+                return None
+
+            # Frames start after the ID3v2 tag, whose size is a 28-bit syncsafe integer
+            audio_start = 0
+            if head[:3] == b'ID3' and len(head) >= 10:
+                tag_size = (head[6] & 0x7f) << 21 | (head[7] & 0x7f) << 14 | (head[8] & 0x7f) << 7 | (head[9] & 0x7f)
+                audio_start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+            frames = head[audio_start:]
+            if len(frames) < PROBE_BYTES // 2:
+                # Large tags (cover art) push the first frames past the first range
+                frames, _ = self.fetch_range(url, audio_start, PROBE_BYTES)
+                if frames is None:
+                    return None
+
+            info = MPEGInfo(io.BytesIO(frames))
+            # A Xing/VBRI header gives the exact length; otherwise the partial buffer only
+            # supports a size-over-bitrate estimate, and the larger of the two is trusted
+            return max(info.length, (total_size - audio_start) * 8 / info.bitrate)
+        except Exception as e:
+            self.logger.warning(f"Could not probe the length of {url}: {str(e)}")
+            return None
+
+    def stream_to_s3(self, file_info):
+        """Upload an episode that needs no cutting straight from the HTTP response, without a temp file."""
+        s3_key = f'audio/podcasts/{self.current_year}/{self.current_month}/{file_info["filename"]}'
+        try:
+            self.logger.info(f"Streaming {file_info['url']} to S3")
+            with self.get_worker_http_session().get(file_info['url'], stream=True, timeout=30) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                self.get_worker_s3_client().upload_fileobj(
+                    response.raw, 'raw-data-bronze', s3_key, Config=self.transfer_config
+                )
+                file_size = response.raw.tell()
+
+            with self.lock:
+                self.total_downloaded_size += file_size
+            self.logger.info(f"Upload complete for {file_info['filename']}: {file_size/1024/1024:.2f} MB")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Error processing {file_info['filename']}: {str(e)}")
+            with self.lock:
+                self.error_files.append(file_info['filename'])
+            return False
+
     def download_and_upload(self, file_info):
+        # Cutting is skipped only when the MP3 itself (not just the feed's itunes:duration) is
+        # under an hour, with a minute of slack for the estimate
+        feed_duration = file_info.get('duration')
+        if feed_duration is None or feed_duration <= 3600 - 60:
+            duration = self.probe_audio_duration(file_info['url'])
+            if duration is not None and duration <= 3600 - 60:
+                return self.stream_to_s3(file_info)
+
         temp_path = Path("/tmp") / file_info['filename']
         try:
             self.logger.info(f"Starting download of {file_info['url']}")
-            response = self.session.get(file_info['url'], stream=True, timeout=30)
+            response = self.get_worker_http_session().get(file_info['url'], stream=True, timeout=30)
             response.raise_for_status()
 
             with open(temp_path, 'wb') as f:
@@ -110,28 +207,26 @@ class PodcastDownloader:
                         f.write(chunk)
 
             file_size = temp_path.stat().st_size
-            self.total_downloaded_size += file_size
+            with self.lock:
+                self.total_downloaded_size += file_size
             self.logger.info(f"Download complete: {file_size/1024/1024:.2f} MB")
 
             # Check and cut audio if needed
             output_path = Path("/tmp") / f"processed_{file_info['filename']}"
             audio_segments = self.cut_audio_if_needed(temp_path, output_path)
 
+            s3_client = self.get_worker_s3_client()
             for segment in audio_segments:
                 s3_key = f'audio/podcasts/{self.current_year}/{self.current_month}/{segment.name}'
-                with open(segment, 'rb') as f:
-                    self.s3_client.put_object(
-                        Bucket='raw-data-bronze',
-                        Key=s3_key,
-                        Body=f
-                    )
+                s3_client.upload_file(str(segment), 'raw-data-bronze', s3_key, Config=self.transfer_config)
                 self.logger.info(f"Upload complete for {segment.name}")
 
             return True
 
         except Exception as e:
             self.logger.error(f"Error processing {file_info['filename']}: {str(e)}")
-            self.error_files.append(file_info['filename'])
+            with self.lock:
+                self.error_files.append(file_info['filename'])
             return False
         finally:
             if temp_path.exists():
@@ -175,6 +270,7 @@ class PodcastDownloader:
         tree = self.read_xml_from_s3()
         files_to_download = []
         skipped_files = 0
+        existing_files = self.list_existing_files()
 
         for item in tree.getroot().find('channel').findall('item'):
             enclosure = item.find('enclosure')
@@ -182,14 +278,17 @@ class PodcastDownloader:
                 url = enclosure.get('url')
                 filename = url.split('/')[-1]
 
-                if self.file_exists_in_s3(filename):
+                if filename in existing_files:
                     self.logger.info(f"Skipping existing file: {filename}")
                     skipped_files += 1
                     continue
 
                 files_to_download.append({
                     'url': url,
-                    'filename': filename
+                    'filename': filename,
+                    'duration': self.parse_feed_duration(
+                        item.findtext('{http://www.itunes.com/dtds/podcast-1.0.dtd}duration')
+                    )
                 })
 
         total_files = len(files_to_download) + skipped_files
@@ -206,7 +305,8 @@ class PodcastDownloader:
         def process_file(file_info):
             nonlocal successful_downloads
             if self.download_and_upload(file_info):
-                successful_downloads += 1
+                with self.lock:
+                    successful_downloads += 1
 
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             list(tqdm(executor.map(process_file, files_to_download), total=len(files_to_download), desc="Downloading files"))
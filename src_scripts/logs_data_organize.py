@@ -1,9 +1,12 @@
 import os
+import io
 import json
 import logging
 import boto3
-import pandas as pd
-from datetime import datetime
+from botocore.config import Config
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 
@@ -12,8 +15,15 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class LogProcessor:
+    LOG_COLUMNS = ['timestamp', 'unique_id', 'event', 'ep']
+    # 256 KiB blocks keep each tokenizer block resident in L2
+    CSV_READ_OPTIONS = csv.ReadOptions(block_size=256 * 1024, column_names=LOG_COLUMNS)
+    CSV_CONVERT_OPTIONS = csv.ConvertOptions(column_types={name: pa.string() for name in LOG_COLUMNS})
+    # Log objects are a single line each, so throughput is bound by request latency, not bandwidth
+    DOWNLOAD_WORKERS = 64
+
     def __init__(self):
-        self.s3_client = boto3.client('s3')
+        self.s3_client = boto3.client('s3', config=Config(max_pool_connections=self.DOWNLOAD_WORKERS))
         self.source_paths = {
             '100k': 'logs/extracted/2024/01/100k',  # Update with actual path
             '30k': 'logs/extracted/2024/01/30k'     # Update with actual path
@@ -21,53 +31,62 @@ class LogProcessor:
         self.target_base_path = 'logs/data'
 
     def fetch_s3_file(self, bucket, key):
-        """Fetches an S3 file and returns its lines."""
+        """Fetches an S3 file and returns its raw bytes."""
         try:
             data = self.s3_client.get_object(Bucket=bucket, Key=key)
-            lines = data['Body'].read().decode('utf-8').splitlines()
-            return lines
+            return data['Body'].read()
         except Exception as e:
             logger.error(f"Error fetching file {key}: {str(e)}")
-            return []
-
-    def process_file_lines(self, lines):
-        """Processes lines in a file and returns processed records."""
-        processed_records = []
-        for line in lines:
-            try:
-                record = self.parse_log_line(line)
-                if record:
-                    processed_records.append(record)
-            except Exception as e:
-                logger.warning(f"Error processing line: {line[:50]}...: {str(e)}")
-        return processed_records
-
-    def parse_log_line(self, line):
-        """Parses a single log line into a structured format."""
-        parts = line.strip().split('|')
-        if len(parts) != 4:
-            return None
-
-        timestamp = datetime.strptime(parts[0], "%Y-%m-%dT%H:%M:%S")
-        return {
-            'timestamp': timestamp.strftime("%Y-%m-%dT%H:%M:%S"),
-            'unique_id': parts[1],
-            'event': parts[2],
-            'episode_number': parts[3].replace('episode-', ''),
-            'year': timestamp.year,
-            'month': timestamp.month,
-            'day': timestamp.day,
-            'time': timestamp.strftime("%H:%M:%S")
-        }
-
-    def write_to_s3(self, bucket, folder_name, data):
+            return b''
+
+    def parse_log_payloads(self, payloads):
+        """Parses raw log file payloads into structured records in one bulk pass."""
+        skipped_rows = []
+
+        def skip_row(row):
+            skipped_rows.append(row.number)
+            return 'skip'
+
+        # Empty or failed fetches come back as b''; with nothing left the CSV reader would reject the input
+        payloads = [payload for payload in payloads if payload]
+        if payloads:
+            # Files don't end with a newline, so join them explicitly to keep lines apart
+            table = csv.read_csv(
+                io.BytesIO(b'\n'.join(payloads)),
+                read_options=self.CSV_READ_OPTIONS,
+                parse_options=csv.ParseOptions(delimiter='|', invalid_row_handler=skip_row),
+                convert_options=self.CSV_CONVERT_OPTIONS
+            )
+        else:
+            table = pa.table({name: pa.array([], type=pa.string()) for name in self.LOG_COLUMNS})
+
+        # Validate all rows at once: a parsable timestamp and an 'episode-<n>' field
+        ts = pc.strptime(table['timestamp'], format="%Y-%m-%dT%H:%M:%S", unit='s', error_is_null=True)
+        valid = pc.and_(pc.is_valid(ts), pc.match_substring_regex(table['ep'], r'^episode-\d+$'))
+        bad_lines = len(skipped_rows) + (pc.sum(pc.invert(valid)).as_py() or 0)
+        if bad_lines:
+            logger.warning(f"Skipped {bad_lines} malformed log lines")
+            table = table.filter(valid)
+            ts = ts.filter(valid)
+
+        return pa.table({
+            'timestamp': pc.strftime(ts, format="%Y-%m-%dT%H:%M:%S"),
+            'unique_id': table['unique_id'],
+            'event': table['event'],
+            'episode_number': pc.replace_substring(table['ep'], 'episode-', '').cast(pa.int32()),
+            'year': pc.year(ts),
+            'month': pc.month(ts),
+            'day': pc.day(ts),
+            'time': pc.strftime(ts, format="%H:%M:%S")
+        }).to_pandas()
+
+    def write_to_s3(self, bucket, folder_name, df):
         """Writes processed data to S3 as a Parquet file."""
         try:
-            df = pd.DataFrame(data)
-            df['episode_number'] = df['episode_number'].astype(int)
-            dates = pd.to_datetime(df['timestamp'])
-            year = str(max(dates).year)
-            month = str(max(dates).month).zfill(2)
+            # Year/month of the latest record, from the already-parsed int columns
+            latest = int((df['year'] * 100 + df['month']).max())
+            year = str(latest // 100)
+            month = f"{latest % 100:02d}"
 
             output_key = f'{self.target_base_path}/{folder_name}/{year}/{month}/{folder_name}_logs.parquet'
 
@@ -106,8 +125,8 @@ class LogProcessor:
                 continue
 
             # Fetch and process files in parallel
-            processed_records = []
-            with ThreadPoolExecutor(max_workers=10) as executor:
+            payloads = []
+            with ThreadPoolExecutor(max_workers=self.DOWNLOAD_WORKERS) as executor:
                 future_to_key = {
                     executor.submit(self.fetch_s3_file, source_bucket, key): key
                     for key in file_keys
@@ -115,13 +134,13 @@ class LogProcessor:
                 for future in as_completed(future_to_key):
                     key = future_to_key[future]
                     try:
-                        lines = future.result()
-                        processed_records.extend(self.process_file_lines(lines))
+                        payloads.append(future.result())
                     except Exception as e:
                         logger.error(f"Error processing file {key}: {str(e)}")
 
+            processed_records = self.parse_log_payloads(payloads)
             logger.info(f"Processed records: {len(processed_records)}")
-            if not processed_records:
+            if processed_records.empty:
                 continue
 
             # Write results to S3
@@ -1,15 +1,95 @@
-import awswrangler as wr
-import pandas as pd
-import json
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import orjson
 import boto3
 from datetime import datetime
 import logging
+from src_scripts.arrow_cache import cached_batch_reader
+from src_scripts.s3_filesystem import get_s3_fs
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 now = datetime.now()
 
+# Only these columns are needed row by row; nulls and the column list come from the parquet footer
+CHECK_COLUMNS = ['title', 'episode', 'duration_seconds', 'year', 'month']
+# Rows per streamed batch; every check is an aggregate that composes across batches
+BATCH_SIZE = 64_000
+CACHE_DIR = '/tmp/qverify_cache'
+
+def column_null_counts(metadata):
+   """Sums the per-column null counts from the row group statistics, or returns None if any are missing."""
+   null_counts = {}
+   for rg in range(metadata.num_row_groups):
+       row_group = metadata.row_group(rg)
+       for i in range(row_group.num_columns):
+           column = row_group.column(i)
+           stats = column.statistics
+           if stats is None or not stats.has_null_count:
+               return None
+           null_counts[column.path_in_schema] = null_counts.get(column.path_in_schema, 0) + stats.null_count
+   return null_counts
+
+def out_of_range(values, low, high):
+   """Flags values outside [low, high] with one subtract and one unsigned compare per value."""
+   if values.dtype.kind != 'i':
+       return (values < low) | (values > high)
+   # Anything below `low` wraps around to a huge unsigned value
+   offset = values - low
+   return offset.view(f'u{offset.itemsize}') > high - low
+
+def merge_value_counts(parts):
+   """
+   Sums per-batch pc.value_counts results into one (values, counts, first) table, where `first`
+   orders the values by first appearance (group_by itself makes no ordering promise).
+   """
+   counts = pa.concat_arrays(parts)
+   return pa.table({
+       'values': counts.field('values'),
+       'counts': counts.field('counts'),
+       'first': pa.array(np.arange(len(counts)))
+   }).group_by('values').aggregate([('counts', 'sum'), ('first', 'min')]) \
+       .select(['values', 'counts_sum', 'first_min']) \
+       .rename_columns(['values', 'counts', 'first'])
+
+def duplicate_values(value_counts):
+   """Returns {value: count} for values seen more than once, most frequent first (ties keep first-seen order)."""
+   duplicates = value_counts.filter(pc.greater(value_counts['counts'], 1))
+   duplicates = duplicates.take(
+       pc.sort_indices(duplicates, sort_keys=[('counts', 'descending'), ('first', 'ascending')])
+   )
+   return dict(zip(duplicates['values'].to_pylist(), duplicates['counts'].to_pylist()))
+
+def check_columns(expected_columns, actual_columns, quality_issues):
+   """Compares the file's columns with the expected ones, recording any mismatch in quality_issues."""
+   if set(expected_columns) != set(actual_columns):
+       quality_issues['column_mismatch'] = {
+           'expected': expected_columns,
+           'actual': actual_columns,
+           'missing': [col for col in expected_columns if col not in actual_columns],
+           'unexpected': [col for col in actual_columns if col not in expected_columns]
+       }
+       print("\n❌ Column mismatch:")
+       print("Expected:", sorted(expected_columns))
+       print("Actual:", sorted(actual_columns))
+   else:
+       print("\n✅ All expected columns present")
+
+def read_check_batches(parquet_file, s3_path):
+   """Reader over the CHECK_COLUMNS batches, served from the local Arrow cache while the S3 object is unchanged."""
+   bucket, key = s3_path.replace('s3://', '').split('/', 1)
+   etag = boto3.client('s3').head_object(Bucket=bucket, Key=key)['ETag'].strip('"')
+   schema = pa.schema([parquet_file.schema_arrow.field(col) for col in CHECK_COLUMNS])
+
+   def load():
+       batches = parquet_file.iter_batches(batch_size=BATCH_SIZE, columns=CHECK_COLUMNS, use_threads=True)
+       return pa.RecordBatchReader.from_batches(schema, batches)
+
+   return cached_batch_reader(CACHE_DIR, etag, CHECK_COLUMNS, load)
+
 def check_data_quality(s3_path):
    expected_columns = [
        'title', 'pubdate', 'year', 'month', 'day', 'time',
@@ -18,14 +98,22 @@ def check_data_quality(s3_path):
        'search_count', 'listen_count', 'like_count'
    ]
 
-   df = wr.s3.read_parquet(s3_path)
+   # One footer fetch serves the schema, the null statistics and the column read
+   parquet_file = pq.ParquetFile(s3_path.replace('s3://', ''), filesystem=get_s3_fs(request_timeout=30), pre_buffer=True)
+   actual_columns = parquet_file.schema_arrow.names
    print("\nData Quality Check Results:")
    print("-" * 50)
 
    quality_issues = {}
 
    # Check null values
-   null_cols = {col: df[col].isnull().sum() for col in df.columns if df[col].isnull().any()}
+   null_counts = column_null_counts(parquet_file.metadata)
+   if null_counts is None:
+       null_counts = dict.fromkeys(actual_columns, 0)
+       for batch in parquet_file.iter_batches(batch_size=BATCH_SIZE):
+           for col, array in zip(batch.schema.names, batch.columns):
+               null_counts[col] += array.null_count
+   null_cols = {col: count for col, count in null_counts.items() if count}
    if null_cols:
        quality_issues['null_values'] = null_cols
        print("❌ Null Values:")
@@ -34,20 +122,65 @@ def check_data_quality(s3_path):
    else:
        print("✅ No null values found")
 
+   # The schema comes from the footer alone; without the checked columns there is no data worth reading
+   missing_check_columns = [col for col in CHECK_COLUMNS if col not in actual_columns]
+   if missing_check_columns:
+       print(f"\n❌ Data checks skipped, missing columns: {missing_check_columns}")
+       check_columns(expected_columns, actual_columns, quality_issues)
+       return quality_issues, parquet_file.metadata.num_rows
+
+   # Stream the checked columns batch by batch, keeping only offending rows and value counts.
+   # Offending rows are kept column-wise as NumPy slices rather than one dict per row.
+   long_episodes = {'episode': [], 'duration_seconds': []}
+   invalid_episodes = []
+   invalid_years = {'episode': [], 'year': []}
+   invalid_months = {'episode': [], 'month': []}
+   title_counts = []
+   episode_counts = []
+   for batch in read_check_batches(parquet_file, s3_path):
+       # Pull each checked column straight out of the Arrow batch (zero-copy when it has no nulls)
+       # and build every row mask in a single block
+       episode = batch.column('episode').to_numpy(zero_copy_only=False)
+       duration_seconds = batch.column('duration_seconds').to_numpy(zero_copy_only=False)
+       year = batch.column('year').to_numpy(zero_copy_only=False)
+       month = batch.column('month').to_numpy(zero_copy_only=False)
+
+       long_mask = duration_seconds > 7200
+       invalid_episode_mask = episode <= 0
+       invalid_year_mask = out_of_range(year, 2015, 2025)
+       invalid_month_mask = out_of_range(month, 1, 12)
+
+       long_episodes['episode'].append(episode[long_mask])
+       long_episodes['duration_seconds'].append(duration_seconds[long_mask])
+       invalid_episodes.extend(episode[invalid_episode_mask].tolist())
+       invalid_years['episode'].append(episode[invalid_year_mask])
+       invalid_years['year'].append(year[invalid_year_mask])
+       invalid_months['episode'].append(episode[invalid_month_mask])
+       invalid_months['month'].append(month[invalid_month_mask])
+       title_counts.append(pc.value_counts(batch.column('title')))
+       episode_counts.append(pc.value_counts(batch.column('episode')))
+
+   # Per-batch counts are merged exactly; a value seen once in two batches is still a duplicate
+   title_counts = merge_value_counts(title_counts)
+   episode_counts = merge_value_counts(episode_counts)
+   long_episodes = {col: np.concatenate(parts) for col, parts in long_episodes.items()}
+   invalid_years = {col: np.concatenate(parts) for col, parts in invalid_years.items()}
+   invalid_months = {col: np.concatenate(parts) for col, parts in invalid_months.items()}
+
    # Check duration
-   long_episodes = df[df['duration_seconds'] > 7200]
-   if not long_episodes.empty:
-       quality_issues['long_episodes'] = long_episodes[['episode', 'duration_seconds']].to_dict('records')
+   if long_episodes['episode'].size:
+       quality_issues['long_episodes'] = long_episodes
        print("\n❌ Duration Issues:")
-       for _, row in long_episodes.iterrows():
-           print(f"   - Episode {row['episode']}: {row['duration_seconds']} seconds")
+       for ep, seconds in zip(long_episodes['episode'], long_episodes['duration_seconds']):
+           print(f"   - Episode {ep}: {seconds} seconds")
    else:
        print("\n✅ All episodes within 1 hour limit")
 
    # Check uniqueness
-   duplicate_titles = df[df.duplicated(['title'], keep=False)]
-   if not duplicate_titles.empty:
-       quality_issues['duplicate_titles'] = duplicate_titles['title'].value_counts().to_dict()
+   # Only the (few) duplicated values get sorted by count
+   duplicate_titles = duplicate_values(title_counts)
+   if duplicate_titles:
+       quality_issues['duplicate_titles'] = duplicate_titles
        print("\n❌ Duplicate Titles:")
        for title, count in quality_issues['duplicate_titles'].items():
            print(f"   - '{title}' appears {count} times")
@@ -55,73 +188,60 @@ def check_data_quality(s3_path):
        print("\n✅ All titles are unique")
 
    # Check episodes
-   invalid_episodes = df[df['episode'] <= 0]
-   if not invalid_episodes.empty:
-       quality_issues['invalid_episodes'] = invalid_episodes['episode'].tolist()
+   if invalid_episodes:
+       quality_issues['invalid_episodes'] = invalid_episodes
        print(f"\n❌ Invalid Episode Numbers: {len(invalid_episodes)} episodes <= 0")
 
-   duplicate_episodes = df[df.duplicated(['episode'], keep=False)]
-   if not duplicate_episodes.empty:
-       quality_issues['duplicate_episodes'] = duplicate_episodes['episode'].value_counts().to_dict()
+   duplicate_episodes = duplicate_values(episode_counts)
+   if duplicate_episodes:
+       quality_issues['duplicate_episodes'] = duplicate_episodes
        print("\n❌ Duplicate Episodes:")
        for ep, count in quality_issues['duplicate_episodes'].items():
            print(f"   - Episode {ep} appears {count} times")
 
    # Check sequence
-   sorted_episodes = sorted(df['episode'].unique())
+   sorted_episodes = np.sort(episode_counts['values'].to_numpy())
+   gaps = np.flatnonzero(np.diff(sorted_episodes) != 1)
    missing_episodes = []
-   for i in range(len(sorted_episodes) - 1):
-       if sorted_episodes[i + 1] - sorted_episodes[i] != 1:
-           missing_episodes.extend(range(sorted_episodes[i] + 1, sorted_episodes[i + 1]))
+   if gaps.size:
+       missing_episodes = np.concatenate(
+           [np.arange(sorted_episodes[i] + 1, sorted_episodes[i + 1]) for i in gaps]
+       ).tolist()
 
    if missing_episodes:
        quality_issues['missing_episodes'] = {
-           'range': {'min': min(sorted_episodes), 'max': max(sorted_episodes)},
+           'range': {'min': sorted_episodes[0], 'max': sorted_episodes[-1]},
            'missing': missing_episodes
        }
        print("\n❌ Missing Episodes:")
-       print(f"   Range: {min(sorted_episodes)} to {max(sorted_episodes)}")
+       print(f"   Range: {sorted_episodes[0]} to {sorted_episodes[-1]}")
        print(f"   Missing: {missing_episodes}")
    else:
-       print(f"\n✅ Episodes continuous from {min(sorted_episodes)} to {max(sorted_episodes)}")
+       print(f"\n✅ Episodes continuous from {sorted_episodes[0]} to {sorted_episodes[-1]}")
 
    # Check dates
-   invalid_years = df[(df['year'] < 2015) | (df['year'] > 2025)]
-   invalid_months = df[(df['month'] < 1) | (df['month'] > 12)]
-
-   if not invalid_years.empty or not invalid_months.empty:
+   if invalid_years['episode'].size or invalid_months['episode'].size:
        quality_issues['invalid_dates'] = {
-           'years': invalid_years[['episode', 'year']].to_dict('records'),
-           'months': invalid_months[['episode', 'month']].to_dict('records')
+           'years': invalid_years,
+           'months': invalid_months
        }
-       if not invalid_years.empty:
+       if invalid_years['episode'].size:
            print("\n❌ Invalid Years:")
-           for _, row in invalid_years.iterrows():
-               print(f"   - Episode {row['episode']}: year = {row['year']}")
-       if not invalid_months.empty:
+           for ep, yr in zip(invalid_years['episode'], invalid_years['year']):
+               print(f"   - Episode {ep}: year = {yr}")
+       if invalid_months['episode'].size:
            print("\n❌ Invalid Months:")
-           for _, row in invalid_months.iterrows():
-               print(f"   - Episode {row['episode']}: month = {row['month']}")
+           for ep, mo in zip(invalid_months['episode'], invalid_months['month']):
+               print(f"   - Episode {ep}: month = {mo}")
    else:
        print("\n✅ All date values valid")
 
    # Check columns
-   if set(expected_columns) != set(df.columns):
-       quality_issues['column_mismatch'] = {
-           'expected': expected_columns,
-           'actual': df.columns.tolist(),
-           'missing': [col for col in expected_columns if col not in df.columns],
-           'unexpected': [col for col in df.columns if col not in expected_columns]
-       }
-       print("\n❌ Column mismatch:")
-       print("Expected:", sorted(expected_columns))
-       print("Actual:", sorted(df.columns))
-   else:
-       print("\n✅ All expected columns present")
+   check_columns(expected_columns, actual_columns, quality_issues)
 
-   return quality_issues, df
+   return quality_issues, parquet_file.metadata.num_rows
 
-def save_quality_report(quality_issues, df, s3_path):
+def save_quality_report(quality_issues, total_records, s3_path):
    now = datetime.now()
    report_name = f"quality_report_{now.year}_{now.month:02d}_{now.day:02d}.json"
    report_path = f"data_quality_reports/podcast_analytics/{now.year}/{now.month:02d}/{now.day:02d}/{report_name}"
@@ -129,7 +249,7 @@ def save_quality_report(quality_issues, df, s3_path):
    report = {
        "timestamp": now.isoformat(),
        "source_file": s3_path,
-       "total_records": len(df),
+       "total_records": total_records,
        "quality_issues": quality_issues if quality_issues else "No issues found"
    }
 
@@ -137,15 +257,19 @@ def save_quality_report(quality_issues, df, s3_path):
    s3.put_object(
        Bucket='curated-data-gold',
        Key=report_path,
-       Body=json.dumps(report, indent=2, default=str)
+       Body=orjson.dumps(
+           report,
+           option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+           default=str
+       )
    )
    print(f"Report saved to s3://curated-data-gold/{report_path}")
 
 def quality_verify_task():
    now = datetime.now()
    s3_path = f"s3://curated-data-gold/analytics/podcast_analytics_full/{now.year}/{now.month:02d}/{now.day:02d}/podcast_analytics_full.parquet"
-   quality_issues, df = check_data_quality(s3_path)
-   save_quality_report(quality_issues, df, s3_path)
+   quality_issues, total_records = check_data_quality(s3_path)
+   save_quality_report(quality_issues, total_records, s3_path)
 
 if __name__ == "__main__":
    quality_verify_task()
\ No newline at end of file
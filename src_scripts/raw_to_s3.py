@@ -1,31 +1,97 @@
 import logging
 import boto3
+from botocore.config import Config
 import zipfile
+import zlib
+import struct
+import hashlib
 import io
+import numpy as np
 from pathlib import Path
 from datetime import datetime
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
+from s3transfer.subscribers import BaseSubscriber
+from concurrent.futures import ThreadPoolExecutor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Members up to this size are inflated in one zlib call; larger ones are streamed through zipfile
+INLINE_MEMBER_MAX_SIZE = 1024 * 1024
+
+def inflate_member(zip_data, info):
+    """
+    Decompress a stored/deflated member straight from the archive bytes with a single zlib call,
+    skipping zipfile's per-member ZipExtFile setup. Returns None if the member needs zipfile
+    (encrypted or another compression method).
+    """
+    if info.flag_bits & 0x1 or info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        return None
+
+    header = zip_data[info.header_offset : info.header_offset + 30]
+    if header[:4] != b"PK\x03\x04":
+        raise zipfile.BadZipFile(f"Bad local file header for {info.filename!r}")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    start = info.header_offset + 30 + name_length + extra_length
+    raw = memoryview(zip_data)[start : start + info.compress_size]
+
+    data = bytes(raw) if info.compress_type == zipfile.ZIP_STORED else zlib.decompress(raw, -15)
+    if zlib.crc32(data) != info.CRC:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for file {info.filename!r}")
+    return data
+
+def hash_file_names(names):
+    """
+    64-bit BLAKE2b hashes of file names, as a compact (8 bytes per entry) stand-in for a set of strings.
+    """
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little") for name in names),
+        dtype=np.uint64
+    )
+
+class ProvideSizeSubscriber(BaseSubscriber):
+    """
+    Tells the TransferManager the upload size up front, so it doesn't seek a
+    streamed zip member to its end (which would decompress it twice).
+    """
+
+    def __init__(self, size):
+        self.size = size
+
+    def on_queued(self, future, **kwargs):
+        future.meta.provide_transfer_size(self.size)
+
 class ParallelChunkExtractor:
     """
-    Processes each ZIP file *sequentially*, but the internal contents
-    of the ZIP are extracted in parallel (chunks) with up to `chunk_workers` threads.
+    Processes up to `zip_workers` ZIP files concurrently; the internal contents
+    of each ZIP are uploaded in parallel (chunks) through one shared TransferManager
+    with up to `chunk_workers` concurrent requests per ZIP.
     """
 
-    def __init__(self, chunk_size=10000, chunk_workers=8):
+    def __init__(self, chunk_size=10000, chunk_workers=8, zip_workers=2):
         """
         :param chunk_size: Number of files from the ZIP to process in each chunk.
-        :param chunk_workers: Number of threads to use for parallel chunk extraction.
+        :param chunk_workers: Number of concurrent uploads for extracted files, per ZIP.
+        :param zip_workers: Number of ZIP files processed concurrently.
         """
         # Use default boto3 client (auto-refresh credentials if on EC2/Cloud9 with an IAM role).
-        self.s3_client = boto3.client("s3")
+        # One client is shared by all threads; its pool must cover every concurrent upload.
+        # Adaptive retries back off client-side on S3 503 SlowDown instead of failing the ZIP.
+        self.s3_client = boto3.client(
+            "s3",
+            config=Config(
+                max_pool_connections=max(chunk_workers * zip_workers, 64),
+                retries={"mode": "adaptive", "max_attempts": 10},
+                tcp_keepalive=True,
+                s3={"addressing_style": "virtual"},
+            ),
+        )
+        self.transfer_config = TransferConfig(max_concurrency=chunk_workers * zip_workers)
 
         self.chunk_size = chunk_size
         self.chunk_workers = chunk_workers
+        self.zip_workers = zip_workers
 
         # Separate local directories for 100k vs. 30k
         # Make sure you actually have these folders and put the right ZIPs in them!
@@ -91,24 +157,22 @@ class ParallelChunkExtractor:
 
     def list_extracted_files(self, bucket, prefix):
         """
-        Return a set of file names (not full paths) that are already
-        in S3 under the specified prefix. Helps skip duplicates.
+        Return the sorted 64-bit hashes of the file names (not full paths) that are
+        already in S3 under the specified prefix. Helps skip duplicates.
         """
-        existing = set()
+        existing = []
         paginator = self.s3_client.get_paginator("list_objects_v2")
         for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-            for obj in page.get("Contents", []):
-                # Keep only the file name after the final slash
-                existing_filename = obj["Key"].rsplit("/", 1)[-1]
-                existing.add(existing_filename)
-        return existing
+            # Keep only the file name after the final slash
+            existing.append(hash_file_names(obj["Key"].rsplit("/", 1)[-1] for obj in page.get("Contents", [])))
+        return np.unique(np.concatenate(existing)) if existing else np.empty(0, dtype=np.uint64)
 
     def process_all_zips(self, bucket_name):
         """
         1. Upload local zips to S3.
         2. Upload the `feed.xml` file to S3 under feeds/{year}/{month}.
         3. For each log_type, list the .zip files in S3.
-        4. Process each ZIP file sequentially, but in parallel chunks internally.
+        4. Process up to `zip_workers` ZIP files concurrently, each in parallel chunks internally.
         5. Print a summary of how many files were in each ZIP and how many were extracted.
         """
         # Step 1: Upload local zips
@@ -139,13 +203,25 @@ class ParallelChunkExtractor:
             logger.info("No ZIP files found at all. Nothing to process.")
             return
 
-        # Process each ZIP file *sequentially*
-        results = []
-        for (zip_key, log_type) in all_zips:
+        # List each extraction prefix once for all ZIPs of that type, instead of once per ZIP
+        existing_by_type = {
+            log_type: self.list_extracted_files(bucket_name, self._extracted_prefix(log_type))
+            for log_type in {log_type for (_, log_type) in all_zips}
+        }
+
+        # Process ZIP files concurrently; one TransferManager pools connections for all uploads
+        def process_zip(zip_key, log_type):
             logger.info(f"\n=== Processing ZIP file: {zip_key} (log_type={log_type}) ===")
-            total_files, extracted_files = self._process_single_zip(bucket_name, zip_key, log_type)
+            total_files, extracted_files = self._process_single_zip(
+                bucket_name, zip_key, log_type, transfer_manager, existing_by_type[log_type]
+            )
             logger.info(f"Completed {zip_key}: extracted {extracted_files}/{total_files} new files.")
-            results.append((zip_key, log_type, total_files, extracted_files))
+            return (zip_key, log_type, total_files, extracted_files)
+
+        with create_transfer_manager(self.s3_client, self.transfer_config) as transfer_manager:
+            with ThreadPoolExecutor(max_workers=self.zip_workers) as executor:
+                futures = [executor.submit(process_zip, zip_key, log_type) for (zip_key, log_type) in all_zips]
+                results = [fut.result() for fut in futures]
 
         # Final summary
         logger.info("\n=== FINAL SUMMARY ===")
@@ -155,9 +231,13 @@ class ParallelChunkExtractor:
             )
         logger.info("\nAll ZIP files have been processed successfully.")
 
-    def _process_single_zip(self, bucket_name, zip_key, log_type):
+    def _extracted_prefix(self, log_type):
+        return f"{self.extracted_base_path}/{self.extract_year}/{self.extract_month}/{log_type}/"
+
+    def _process_single_zip(self, bucket_name, zip_key, log_type, transfer_manager, existing):
         """
-        Download the zip from S3, break it into chunks, and process each chunk in parallel.
+        Download the zip from S3, break it into chunks, and upload each chunk in parallel,
+        skipping files whose name hashes are in `existing`.
         Returns (total_files_in_zip, newly_extracted_count).
         """
         try:
@@ -165,41 +245,49 @@ class ParallelChunkExtractor:
             response = self.s3_client.get_object(Bucket=bucket_name, Key=zip_key)
             zip_data = response["Body"].read()
 
+            # The central directory is parsed once; workers get ZipInfo entries, not names to look up
             with zipfile.ZipFile(io.BytesIO(zip_data), "r") as zf:
-                all_files = zf.namelist()
-
-            total_files = len(all_files)
-            if not all_files:
-                logger.warning(f"{zip_key} is empty or no files found inside.")
-                return (0, 0)
-
-            target_prefix = f"{self.extracted_base_path}/{self.extract_year}/{self.extract_month}/{log_type}/"
-            existing = self.list_extracted_files(bucket_name, target_prefix)
-
-            chunks = [
-                all_files[i : i + self.chunk_size]
-                for i in range(0, total_files, self.chunk_size)
-            ]
-            logger.info(f"{zip_key}: Found {total_files} files -> {len(chunks)} chunk(s).")
-
-            extracted_count = 0
-
-            def process_chunk(file_chunk):
-                local_extracted = 0
-                with zipfile.ZipFile(io.BytesIO(zip_data), "r") as local_zf:
-                    for f_name in file_chunk:
-                        if f_name in existing:
-                            continue
-                        file_data = local_zf.read(f_name)
-                        target_key = f"{target_prefix}{f_name}"
-                        self.s3_client.put_object(Bucket=bucket_name, Key=target_key, Body=file_data)
-                        local_extracted += 1
-                return local_extracted
-
-            with ThreadPoolExecutor(max_workers=self.chunk_workers) as executor:
-                futures = [executor.submit(process_chunk, chunk_list) for chunk_list in chunks]
-                for fut in as_completed(futures):
-                    extracted_count += fut.result()
+                all_files = zf.infolist()
+
+                total_files = len(all_files)
+                if not all_files:
+                    logger.warning(f"{zip_key} is empty or no files found inside.")
+                    return (0, 0)
+
+                target_prefix = self._extracted_prefix(log_type)
+
+                # One vectorised membership test against the hashes of already-extracted files
+                already_extracted = np.isin(hash_file_names(info.filename for info in all_files), existing)
+                pending = [info for info, done in zip(all_files, already_extracted) if not done]
+
+                chunks = [
+                    pending[i : i + self.chunk_size]
+                    for i in range(0, len(pending), self.chunk_size)
+                ]
+                logger.info(f"{zip_key}: Found {total_files} files ({len(pending)} new) -> {len(chunks)} chunk(s).")
+
+                extracted_count = 0
+
+                # Small members are inflated directly from the archive bytes; large ones are streamed,
+                # each ZipExtFile decompressing lazily while its upload reads it.
+                # A chunk of uploads is submitted at a time to bound the number of open members.
+                for file_chunk in chunks:
+                    uploads = []
+                    for info in file_chunk:
+                        target_key = f"{target_prefix}{info.filename}"
+                        data = inflate_member(zip_data, info) if info.file_size <= INLINE_MEMBER_MAX_SIZE else None
+                        member = io.BytesIO(data) if data is not None else zf.open(info, "r")
+                        future = transfer_manager.upload(
+                            member, bucket_name, target_key,
+                            subscribers=[ProvideSizeSubscriber(info.file_size)]
+                        )
+                        uploads.append((future, member))
+                    for future, member in uploads:
+                        try:
+                            future.result()
+                        finally:
+                            member.close()
+                    extracted_count += len(uploads)
 
             return total_files, extracted_count
 
@@ -210,7 +298,8 @@ class ParallelChunkExtractor:
 
 def main():
     bucket_name = "raw-data-bronze"
-    extractor = ParallelChunkExtractor(chunk_size=10000, chunk_workers=8)
+    # Extracted members are tiny, so each upload is one round trip: keep many in flight
+    extractor = ParallelChunkExtractor(chunk_size=10000, chunk_workers=64)
     extractor.process_all_zips(bucket_name)
 
 
@@ -0,0 +1,13 @@
+from functools import lru_cache
+from pyarrow import fs
+
+S3_REGION = 'il-central-1'
+
+@lru_cache(maxsize=None)
+def get_s3_fs(**options):
+    """
+    Native pyarrow S3 filesystem in the pipeline's region, one per process and set of options.
+    Built on first use rather than at import, so parsing the DAG never initialises the AWS SDK
+    that forked task processes would then inherit.
+    """
+    return fs.S3FileSystem(region=S3_REGION, **options)
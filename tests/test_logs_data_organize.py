@@ -0,0 +1,26 @@
+from src_scripts.logs_data_organize import LogProcessor
+
+EXPECTED_COLUMNS = ['timestamp', 'unique_id', 'event', 'episode_number', 'year', 'month', 'day', 'time']
+
+
+def test_parse_log_payloads_only_empty_files():
+    df = LogProcessor().parse_log_payloads([b''])
+
+    assert df.empty
+    assert list(df.columns) == EXPECTED_COLUMNS
+
+
+def test_parse_log_payloads_skips_empty_files():
+    payloads = [
+        b'',
+        b'2024-01-01T01:45:00|98899787-0ea3-402f-95c8-33b62d95c37d|search|episode-106',
+        b'',
+        b'2024-01-02T13:05:09|0f0c6b5e-8f0e-4d55-9c1e-1f4b1e6c2a11|listen|episode-7',
+    ]
+
+    df = LogProcessor().parse_log_payloads(payloads)
+
+    assert list(df.columns) == EXPECTED_COLUMNS
+    assert df['episode_number'].tolist() == [106, 7]
+    assert df['event'].tolist() == ['search', 'listen']
+    assert df['time'].tolist() == ['01:45:00', '13:05:09']